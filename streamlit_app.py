@@ -5,11 +5,16 @@ Host on Streamlit Cloud for free: https://streamlit.io/cloud
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 import re
 from datetime import datetime
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle, DEFAULT_FONT
+from openpyxl.cell import WriteOnlyCell
 
 
 # ============== PAGE CONFIG ==============
@@ -57,6 +62,27 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# ============== PATTERNS ==============
+P2P_STATEMENT_RE = re.compile(r'd17-(\d+)-')
+CARD_NUMBER_PREFIX_RE = re.compile(r'^(\d+)')
+AUTH_CODE_RE = re.compile(r'(\d{6})$')
+TRANSFERT_VERS_ACCOUNT_RE = re.compile(r'Transfert vers (\d+)')
+FLOAT_SUFFIX_RE = re.compile(r'\.0$')
+
+
+# ============== INPUT COLUMNS ==============
+# Only these columns are used by the reconciliation; anything else in an export is skipped at parse time
+CARD_JOURNAL_COLUMNS = {'DATE', 'HEURE', 'MONTANT', 'LIBELLE'}
+P2P_STATEMENT_COLUMNS = {'Date', 'Time', 'Type', 'Auth', 'Amount', 'To Account'}
+
+
+# ============== RESULT LAYOUTS ==============
+MISSING_IN_P2P_COLUMNS = ['Auth', 'Date', 'Time', 'Amount', 'Description']
+MISSING_IN_CARD_COLUMNS = ['Auth', 'Date', 'Time', 'Amount', 'Type']
+MATCHED_DETAIL_COLUMNS = ['Auth', 'Date', 'P2P_Amount', 'Adjusted_Amount', 'Card_Amount', 'Difference', 'Status', 'Fee_Applied']
+CARD_SHEET_COLUMN_WIDTHS = {'A': 14, 'B': 12, 'C': 14, 'D': 12, 'E': 14, 'F': 10, 'G': 10, 'H': 35}
+
+
 # ============== FUNCTIONS ==============
 def extract_card_number(filename):
     """Extract card number from filename - very flexible matching"""
@@ -64,156 +90,180 @@ def extract_card_number(filename):
     
     # P2P Statement pattern: contains "statement" and "d17-XXX-"
     if 'statement' in filename_lower:
-        match = re.search(r'd17-(\d+)-', filename_lower)
+        match = P2P_STATEMENT_RE.search(filename_lower)
         if match:
             return str(int(match.group(1))), 'p2p_statement'
     
     # Card Journal patterns - anything that starts with a number
     # Examples: "342-journal-31-12-2025.csv", "308-d17-journal.csv", "075-D17-31-01-2026.csv"
-    match = re.match(r'^(\d+)', filename_lower)
+    match = CARD_NUMBER_PREFIX_RE.match(filename_lower)
     if match:
         return str(int(match.group(1))), 'card_journal'
     
     return None, None
 
 
-def load_card_journal(file):
-    """Load and parse the Card Journal CSV"""
-    try:
-        df = pd.read_csv(file, sep=';')
-        if len(df.columns) == 1:
-            file.seek(0)
-            df = pd.read_csv(file, sep=',')
-    except:
-        file.seek(0)
-        df = pd.read_csv(file, sep=',')
+# Cached loaders and per-card results are bounded (entries and age) so a long session that
+# cycles through many uploads doesn't keep every parsed file in memory
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def load_card_journal(file_bytes):
+    """Load and parse the Card Journal CSV (cached per file content)"""
+    # Journals are exported with either ';' or ',' - pick it from the header line
+    # so the file is only parsed once
+    header = file_bytes.split(b'\n', 1)[0].decode('utf-8', errors='ignore')
+    sep = ';' if ';' in header else ','
+    
+    # pyarrow only selects columns by the file's own names (which may carry stray spaces),
+    # so read the header alone first
+    header_names = pd.read_csv(BytesIO(file_bytes), sep=sep, nrows=0).columns
+    usecols = [name for name in header_names if name.strip() in CARD_JOURNAL_COLUMNS]
+    
+    # All columns are read as text: MONTANT uses a decimal comma and DATE is day-first,
+    # both are converted below. The string types are set in pyarrow itself - pandas'
+    # engine='pyarrow' applies dtype=str only after type inference, which turns HEURE
+    # into times ("04:13" -> "04:13:00")
+    table = pa_csv.read_csv(
+        BytesIO(file_bytes),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types={name: pa.string() for name in usecols},
+            strings_can_be_null=True
+        )
+    )
+    df = table.to_pandas()
     
     df.columns = df.columns.str.strip()
     
     if 'DATE' in df.columns:
-        df['DATE'] = df['DATE'].astype(str).str.strip()
-        try:
-            df['DATE'] = pd.to_datetime(df['DATE'], format='%d/%m/%Y')
-        except:
-            df['DATE'] = pd.to_datetime(df['DATE'], dayfirst=True)
+        df['DATE'] = df['DATE'].str.strip()
+        # Parse the known day-first format in one pass; only rows that don't fit it go through inference
+        dates = pd.to_datetime(df['DATE'], format='%d/%m/%Y', errors='coerce', cache=True)
+        unparsed = dates.isna() & df['DATE'].notna()
+        if unparsed.any():
+            dates[unparsed] = pd.to_datetime(df.loc[unparsed, 'DATE'], dayfirst=True, cache=True)
+        df['DATE'] = dates
     
     if 'MONTANT' in df.columns:
-        df['MONTANT'] = df['MONTANT'].astype(str).str.replace(',', '.').astype(float)
+        df['MONTANT'] = df['MONTANT'].str.replace(',', '.').astype(float)
+        df['AbsAmount'] = df['MONTANT'].abs()  # Unsigned amount used for matching and totals
     
     if 'LIBELLE' in df.columns:
-        df['Auth'] = df['LIBELLE'].str.extract(r'(\d{6})$')
+        df['Auth'] = df['LIBELLE'].str.extract(AUTH_CODE_RE, expand=False)
+        
+        # Transaction-kind flags are scanned once per file here, so the IN/OUT filters that re-run
+        # for every date or option change only combine booleans (case-insensitive plain substrings)
+        libelle = df['LIBELLE'].str.lower()
+        df['IsTransfertDu'] = libelle.str.contains('transfert du', regex=False, na=False)
+        df['IsTransfertVers'] = libelle.str.contains('transfert vers', regex=False, na=False)
+        df['IsMandat'] = libelle.str.contains('mandat', regex=False, na=False)
     
     return df
 
 
-def load_p2p_statement(file):
-    """Load and parse the P2P Statement CSV"""
-    df = pd.read_csv(file)
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def load_p2p_statement(file_bytes):
+    """Load and parse the P2P Statement CSV (cached per file content)"""
+    # Auth and To Account rely on numeric inference, so no dtype is forced here; low_memory=False
+    # infers each column from the whole file instead of chunk by chunk
+    df = pd.read_csv(BytesIO(file_bytes), usecols=lambda name: name.strip() in P2P_STATEMENT_COLUMNS, low_memory=False)
     df.columns = df.columns.str.strip()
     
+    # Statements use ISO dates; only the rows that aren't ISO fall back to per-value format inference
     if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
+        dates = pd.to_datetime(df['Date'], format='ISO8601', errors='coerce', cache=True)
+        unparsed = dates.isna() & df['Date'].notna()
+        if unparsed.any():
+            dates[unparsed] = pd.to_datetime(df.loc[unparsed, 'Date'], cache=True)
+        df['Date'] = dates
+    
+    # Only a handful of transaction types: store as categorical so Type filters compare integer codes
+    if 'Type' in df.columns:
+        df['Type'] = df['Type'].astype('category')
     
     # Convert Auth to string (handle NaN and float)
     if 'Auth' in df.columns:
-        df['Auth'] = df['Auth'].fillna('').astype(str)
-        df['Auth'] = df['Auth'].str.replace(r'\.0$', '', regex=True)
+        if pd.api.types.is_numeric_dtype(df['Auth']):
+            # Numeric codes are read as float because of blank rows: go through nullable ints
+            # instead of stripping '.0' from every formatted float
+            auth = df['Auth'].astype('Int64')
+            df['Auth'] = auth.astype(str).where(auth.notna(), '')
+        else:
+            df['Auth'] = df['Auth'].fillna('').astype(str)
+            df['Auth'] = df['Auth'].str.replace(FLOAT_SUFFIX_RE, '', regex=True)
     
     return df
 
 
 def get_in_transactions_card(df, from_date):
     """Get incoming transactions from Card Journal (Transfert du)"""
-    filtered = df[df['DATE'] >= from_date].copy()
-    if 'LIBELLE' not in filtered.columns or filtered.empty:
-        return pd.DataFrame()
-    
-    incoming = filtered[filtered['LIBELLE'].str.contains('Transfert du', case=False, na=False)].copy()
-    
-    if incoming.empty:
+    if 'LIBELLE' not in df.columns:
         return pd.DataFrame()
     
-    incoming = incoming[incoming['MONTANT'] > 0].copy()
+    # Period, keyword flag (set at load time) and positive amount share one mask, so rows are selected in one step
+    is_incoming = (df['DATE'] >= from_date) & df['IsTransfertDu'] & (df['MONTANT'] > 0)
+    incoming = df[is_incoming]
     
     if incoming.empty:
         return pd.DataFrame()
     
-    incoming['Auth'] = incoming['Auth'].astype(str)
     return incoming.reset_index(drop=True)
 
 
 def get_out_transactions_card(df, from_date, include_withdrawal=True, include_mandat=True):
     """Get outgoing transactions from Card Journal (Transfert vers + Mandat)"""
-    filtered = df[df['DATE'] >= from_date].copy()
+    filtered = df[df['DATE'] >= from_date]
     if 'LIBELLE' not in filtered.columns or filtered.empty:
         return pd.DataFrame()
     
-    # Build filter conditions based on options
-    conditions = pd.Series([False] * len(filtered), index=filtered.index)
+    # Build filter conditions based on options (keyword flags are set at load time)
+    conditions = pd.Series(np.zeros(len(filtered), dtype=bool), index=filtered.index)
     
     if include_withdrawal:
-        conditions = conditions | filtered['LIBELLE'].str.contains('Transfert vers', case=False, na=False)
+        conditions = conditions | filtered['IsTransfertVers']
     
     if include_mandat:
-        conditions = conditions | filtered['LIBELLE'].str.contains('Mandat', case=False, na=False)
+        conditions = conditions | filtered['IsMandat']
     
     outgoing = filtered[conditions].copy()
     
     if outgoing.empty:
         return pd.DataFrame()
     
-    outgoing['MONTANT'] = outgoing['MONTANT'].abs()  # Make positive for comparison
+    outgoing['MONTANT'] = outgoing['AbsAmount']  # Make positive for comparison
     
     # Extract account number for "Transfert vers" (e.g., "Transfert vers 29526566 230314" -> "29526566")
-    outgoing['ToAccount'] = outgoing['LIBELLE'].apply(
-        lambda x: re.search(r'Transfert vers (\d+)', str(x)).group(1) if re.search(r'Transfert vers (\d+)', str(x)) else None
+    outgoing['ToAccount'] = outgoing['LIBELLE'].str.extract(TRANSFERT_VERS_ACCOUNT_RE, expand=False)
+    
+    # Create a match key: Date + Amount + ToAccount (for transfers) or Date + Amount + MANDAT (for mandats).
+    # The amount goes in as integer cents, so both sides agree without float formatting
+    # (a blank amount keeps a 'nan' placeholder so the row is still reported)
+    has_account = outgoing['ToAccount'].notna() & (outgoing['ToAccount'] != '')
+    account = pd.Series(np.where(has_account, outgoing['ToAccount'].astype(str), 'MANDAT'), index=outgoing.index)
+    outgoing['MatchKey'] = outgoing['DATE'].dt.strftime('%Y-%m-%d').str.cat(
+        [(outgoing['MONTANT'] * 100).round().astype('Int64').astype(str).fillna('nan'), account], sep='_'
     )
     
-    # For Mandat, we'll match by amount and date only
-    outgoing['IsMandat'] = outgoing['LIBELLE'].str.contains('Mandat', case=False, na=False)
-    
-    # Create a match key: Date + Amount + ToAccount (for transfers) or Date + Amount + MANDAT (for mandats)
-    def create_match_key(row):
-        date_str = row['DATE'].strftime('%Y-%m-%d')
-        amount_str = f"{row['MONTANT']:.2f}"
-        if pd.notna(row['ToAccount']) and row['ToAccount']:
-            return f"{date_str}_{amount_str}_{row['ToAccount']}"
-        else:
-            return f"{date_str}_{amount_str}_MANDAT"
-    
-    outgoing['MatchKey'] = outgoing.apply(create_match_key, axis=1)
-    
     return outgoing.reset_index(drop=True)
 
 
 def get_in_transactions_p2p(df, from_date):
     """Get incoming transactions from P2P Statement (DEPOSIT)"""
+    # Type, period and Auth conditions share one mask, so rows are selected (and copied) once
+    is_deposit = df['Auth'] != ''
     if 'Type' in df.columns:
-        deposits = df[df['Type'] == 'DEPOSIT'].copy()
-    else:
-        deposits = df.copy()
-    
-    if deposits.empty:
-        return pd.DataFrame()
-    
-    # Apply date filter
-    if 'Date' in deposits.columns:
-        deposits = deposits[deposits['Date'] >= from_date].copy()
-    
-    if deposits.empty:
-        return pd.DataFrame()
-    
-    deposits = deposits[deposits['Auth'] != ''].copy()
+        is_deposit &= df['Type'] == 'DEPOSIT'
+    if 'Date' in df.columns:
+        is_deposit &= df['Date'] >= from_date
+    deposits = df[is_deposit].copy()
     
     if deposits.empty:
         return pd.DataFrame()
     
     if 'Amount' in deposits.columns:
-        deposits['Adjusted_Amount'] = deposits['Amount'].apply(
-            lambda x: x * 0.99 if x > 40 else x
-        )
+        amount = deposits['Amount'].to_numpy()
+        deposits['Adjusted_Amount'] = np.where(amount > 40, amount * 0.99, amount)
     
-    deposits['Auth'] = deposits['Auth'].astype(str)
     return deposits.reset_index(drop=True)
 
 
@@ -223,7 +273,7 @@ def get_out_transactions_p2p(df, from_date, include_withdrawal=True, include_cas
         return pd.DataFrame()
     
     # Build filter conditions based on options
-    conditions = pd.Series([False] * len(df), index=df.index)
+    conditions = pd.Series(np.zeros(len(df), dtype=bool), index=df.index)
     
     if include_withdrawal:
         conditions = conditions | (df['Type'] == 'WITHDRAWAL')
@@ -231,44 +281,75 @@ def get_out_transactions_p2p(df, from_date, include_withdrawal=True, include_cas
     if include_cashout:
         conditions = conditions | (df['Type'] == 'CASHOUT')
     
-    withdrawals = df[conditions].copy()
+    withdrawals = df[conditions]
     
     if withdrawals.empty:
         return pd.DataFrame()
     
     # Apply date filter
     if 'Date' in withdrawals.columns:
-        withdrawals = withdrawals[withdrawals['Date'] >= from_date].copy()
+        withdrawals = withdrawals[withdrawals['Date'] >= from_date]
     
     if withdrawals.empty:
         return pd.DataFrame()
     
+    # Single copy of the filtered rows before adding columns
+    withdrawals = withdrawals.copy()
+    
     if 'Amount' in withdrawals.columns:
         withdrawals['Amount'] = withdrawals['Amount'].abs()  # Make positive for comparison
         withdrawals['Adjusted_Amount'] = withdrawals['Amount']  # No fee adjustment for withdrawals
     
     # Get To Account for WITHDRAWAL, empty for CASHOUT
     if 'To Account' in withdrawals.columns:
-        withdrawals['ToAccount'] = withdrawals['To Account'].apply(
-            lambda x: str(int(x)) if pd.notna(x) and x != '' else ''
-        )
+        accounts = pd.to_numeric(withdrawals['To Account']).astype('Int64')
+        withdrawals['ToAccount'] = accounts.astype(str).where(accounts.notna(), '')
     else:
         withdrawals['ToAccount'] = ''
     
-    # Create match key: Date + Amount + ToAccount (for WITHDRAWAL) or Date + Amount + MANDAT (for CASHOUT)
-    def create_match_key(row):
-        date_str = row['Date'].strftime('%Y-%m-%d')
-        amount_str = f"{row['Amount']:.2f}"
-        if row['ToAccount'] and row['ToAccount'] != '':
-            return f"{date_str}_{amount_str}_{row['ToAccount']}"
-        else:
-            return f"{date_str}_{amount_str}_MANDAT"
-    
-    withdrawals['MatchKey'] = withdrawals.apply(create_match_key, axis=1)
+    # Create match key: Date + Amount (integer cents) + ToAccount (for WITHDRAWAL) or Date + Amount + MANDAT (for CASHOUT)
+    has_account = withdrawals['ToAccount'] != ''
+    account = pd.Series(np.where(has_account, withdrawals['ToAccount'], 'MANDAT'), index=withdrawals.index)
+    withdrawals['MatchKey'] = withdrawals['Date'].dt.strftime('%Y-%m-%d').str.cat(
+        [(withdrawals['Amount'] * 100).round().astype('Int64').astype(str).fillna('nan'), account], sep='_'
+    )
     
     return withdrawals.reset_index(drop=True)
 
 
+def keyed_card_rows(card_df, key_field, label_field):
+    """One Card Journal row per match key (first occurrence), in a fixed column layout"""
+    if card_df.empty or key_field not in card_df.columns:
+        return pd.DataFrame(columns=['Key', 'Card_Label', 'Card_Date', 'Card_Time', 'Card_Amount', 'Description'])
+    
+    rows = card_df.dropna(subset=[key_field]).drop_duplicates(subset=key_field)
+    return pd.DataFrame({
+        'Key': rows[key_field],
+        'Card_Label': rows[label_field] if label_field in rows.columns else '-',
+        'Card_Date': rows['DATE'],
+        'Card_Time': rows['HEURE'].str.strip() if 'HEURE' in rows.columns else '',
+        'Card_Amount': rows['AbsAmount'],
+        'Description': rows['LIBELLE'] if 'LIBELLE' in rows.columns else ''
+    })
+
+
+def keyed_p2p_rows(p2p_df, key_field, label_field):
+    """One P2P Statement row per match key (first occurrence), in a fixed column layout"""
+    if p2p_df.empty or key_field not in p2p_df.columns:
+        return pd.DataFrame(columns=['Key', 'P2P_Label', 'P2P_Date', 'P2P_Time', 'P2P_Amount', 'Adjusted_Amount', 'Type'])
+    
+    rows = p2p_df.dropna(subset=[key_field]).drop_duplicates(subset=key_field)
+    return pd.DataFrame({
+        'Key': rows[key_field],
+        'P2P_Label': rows[label_field] if label_field in rows.columns else '-',
+        'P2P_Date': rows['Date'],
+        'P2P_Time': rows['Time'].astype(str) if 'Time' in rows.columns else '',
+        'P2P_Amount': rows['Amount'],
+        'Adjusted_Amount': rows['Adjusted_Amount'],
+        'Type': rows['Type'] if 'Type' in rows.columns else '-'
+    })
+
+
 def reconcile_transactions(card_df, p2p_df, direction='IN'):
     """Reconcile transactions between Card Journal and P2P Statement"""
     
@@ -276,110 +357,86 @@ def reconcile_transactions(card_df, p2p_df, direction='IN'):
         return {
             'summary': {'card_count': 0, 'p2p_count': 0, 'matched': 0, 
                        'missing_in_p2p': 0, 'missing_in_card': 0},
-            'missing_in_p2p': [], 'missing_in_card': [], 
-            'matched_details': [], 'discrepancies': [],
+            'missing_in_p2p': pd.DataFrame(columns=MISSING_IN_P2P_COLUMNS),
+            'missing_in_card': pd.DataFrame(columns=MISSING_IN_CARD_COLUMNS),
+            'matched_details': pd.DataFrame(columns=MATCHED_DETAIL_COLUMNS),
+            'discrepancies': pd.DataFrame(columns=MATCHED_DETAIL_COLUMNS),
             'totals': {'card': 0, 'p2p': 0, 'adjusted': 0, 'difference': 0},
             'missing_amount': 0
         }
     
     # For IN transactions, use Auth code; for OUT, use MatchKey
-    if direction == 'IN':
-        card_keys = set(card_df['Auth'].dropna()) if not card_df.empty else set()
-        p2p_keys = set(p2p_df['Auth'].dropna()) if not p2p_df.empty else set()
-        key_field_card = 'Auth'
-        key_field_p2p = 'Auth'
-    else:  # OUT
-        card_keys = set(card_df['MatchKey'].dropna()) if not card_df.empty and 'MatchKey' in card_df.columns else set()
-        p2p_keys = set(p2p_df['MatchKey'].dropna()) if not p2p_df.empty and 'MatchKey' in p2p_df.columns else set()
-        key_field_card = 'MatchKey'
-        key_field_p2p = 'MatchKey'
-    
-    missing_in_p2p = card_keys - p2p_keys
-    missing_in_card = p2p_keys - card_keys
-    matched = card_keys & p2p_keys
+    key_field = 'Auth' if direction == 'IN' else 'MatchKey'
+    label_field = 'Auth' if direction == 'IN' else 'ToAccount'
+    
+    # Single hash join on the key instead of a DataFrame scan per key
+    merged = keyed_card_rows(card_df, key_field, label_field).merge(
+        keyed_p2p_rows(p2p_df, key_field, label_field),
+        on='Key', how='outer', indicator=True, sort=True
+    )
+    only_card = merged[merged['_merge'] == 'left_only']
+    only_p2p = merged[merged['_merge'] == 'right_only']
+    matched = merged[merged['_merge'] == 'both']
     
     results = {
         'summary': {
             'card_count': len(card_df),
             'p2p_count': len(p2p_df),
             'matched': len(matched),
-            'missing_in_p2p': len(missing_in_p2p),
-            'missing_in_card': len(missing_in_card)
+            'missing_in_p2p': len(only_card),
+            'missing_in_card': len(only_p2p)
         },
-        'missing_in_p2p': [],
-        'missing_in_card': [],
-        'matched_details': [],
-        'discrepancies': []
+        # Detail tables stay DataFrames; callers iterate or display them directly
+        'missing_in_p2p': pd.DataFrame(columns=MISSING_IN_P2P_COLUMNS),
+        'missing_in_card': pd.DataFrame(columns=MISSING_IN_CARD_COLUMNS),
+        'matched_details': pd.DataFrame(columns=MATCHED_DETAIL_COLUMNS),
+        'discrepancies': pd.DataFrame(columns=MATCHED_DETAIL_COLUMNS)
     }
     
     # Missing in P2P
-    for key in missing_in_p2p:
-        if not card_df.empty:
-            rows = card_df[card_df[key_field_card] == key]
-            if not rows.empty:
-                row = rows.iloc[0]
-                results['missing_in_p2p'].append({
-                    'Auth': row.get('Auth', key) if direction == 'IN' else row.get('ToAccount', '-'),
-                    'Date': row['DATE'].strftime('%d/%m/%Y'),
-                    'Time': str(row.get('HEURE', '')).strip(),
-                    'Amount': abs(row['MONTANT']),
-                    'Description': row.get('LIBELLE', '')
-                })
+    if not only_card.empty:
+        results['missing_in_p2p'] = pd.DataFrame({
+            'Auth': only_card['Card_Label'],
+            'Date': only_card['Card_Date'].dt.strftime('%d/%m/%Y'),
+            'Time': only_card['Card_Time'],
+            'Amount': only_card['Card_Amount'],
+            'Description': only_card['Description']
+        }).reset_index(drop=True)
     
     # Missing in Card
-    for key in missing_in_card:
-        if not p2p_df.empty:
-            rows = p2p_df[p2p_df[key_field_p2p] == key]
-            if not rows.empty:
-                row = rows.iloc[0]
-                results['missing_in_card'].append({
-                    'Auth': row.get('Auth', '-') if direction == 'IN' else row.get('ToAccount', '-'),
-                    'Date': row['Date'].strftime('%d/%m/%Y'),
-                    'Time': str(row.get('Time', '')),
-                    'Amount': row['Amount'],
-                    'Type': row.get('Type', '-')
-                })
+    if not only_p2p.empty:
+        results['missing_in_card'] = pd.DataFrame({
+            'Auth': only_p2p['P2P_Label'],
+            'Date': only_p2p['P2P_Date'].dt.strftime('%d/%m/%Y'),
+            'Time': only_p2p['P2P_Time'],
+            'Amount': only_p2p['P2P_Amount'],
+            'Type': only_p2p['Type']
+        }).reset_index(drop=True)
     
     # Matched details
-    total_card = 0
-    total_p2p = 0
-    total_adjusted = 0
-    
-    for key in sorted(matched):
-        card_rows = card_df[card_df[key_field_card] == key]
-        p2p_rows = p2p_df[p2p_df[key_field_p2p] == key]
-        
-        if not card_rows.empty and not p2p_rows.empty:
-            card_row = card_rows.iloc[0]
-            p2p_row = p2p_rows.iloc[0]
-            
-            card_amt = abs(card_row['MONTANT'])
-            p2p_amt = p2p_row['Amount']
-            adj_amt = p2p_row['Adjusted_Amount']
-            diff = round(card_amt - adj_amt, 2)
-            
-            total_card += card_amt
-            total_p2p += p2p_amt
-            total_adjusted += adj_amt
-            
-            status = "OK" if abs(diff) < 0.01 else "DIFF"
-            fee_applied = "Yes" if p2p_amt > 40 and direction == 'IN' else "No"
-            
-            detail = {
-                'Auth': card_row.get('Auth', '-') if direction == 'IN' else card_row.get('ToAccount', '-'),
-                'Date': card_row['DATE'].strftime('%d/%m/%Y'),
-                'P2P_Amount': p2p_amt,
-                'Adjusted_Amount': round(adj_amt, 2),
-                'Card_Amount': card_amt,
-                'Difference': diff,
-                'Status': status,
-                'Fee_Applied': fee_applied
-            }
-            results['matched_details'].append(detail)
-            
-            if abs(diff) >= 0.01:
-                results['discrepancies'].append(detail)
-    
+    if not matched.empty:
+        # Amount columns as plain float arrays: difference, status and fee flags in one NumPy pass
+        card_amt = matched['Card_Amount'].to_numpy(dtype=float)
+        adj_amt = matched['Adjusted_Amount'].to_numpy(dtype=float)
+        p2p_amt = matched['P2P_Amount'].to_numpy(dtype=float)
+        diff = np.round(card_amt - adj_amt, 2)
+        abs_diff = np.abs(diff)
+        details = pd.DataFrame({
+            'Auth': matched['Card_Label'].to_numpy(),
+            'Date': matched['Card_Date'].dt.strftime('%d/%m/%Y').to_numpy(),
+            'P2P_Amount': p2p_amt,
+            'Adjusted_Amount': np.round(adj_amt, 2),
+            'Card_Amount': card_amt,
+            'Difference': diff,
+            'Status': np.where(abs_diff < 0.01, 'OK', 'DIFF'),
+            'Fee_Applied': np.where((p2p_amt > 40) & (direction == 'IN'), 'Yes', 'No')
+        })
+        results['matched_details'] = details
+        results['discrepancies'] = details[abs_diff >= 0.01].reset_index(drop=True)
+    
+    total_card = float(matched['Card_Amount'].sum())
+    total_p2p = float(matched['P2P_Amount'].sum())
+    total_adjusted = float(matched['Adjusted_Amount'].sum())
     results['totals'] = {
         'card': round(total_card, 2),
         'p2p': round(total_p2p, 2),
@@ -387,17 +444,85 @@ def reconcile_transactions(card_df, p2p_df, direction='IN'):
         'difference': round(total_card - total_adjusted, 2)
     }
     
-    if results['missing_in_p2p']:
-        results['missing_amount'] = sum(item['Amount'] for item in results['missing_in_p2p'])
-    else:
-        results['missing_amount'] = 0
+    results['missing_amount'] = float(only_card['Card_Amount'].sum())
     
     return results
 
 
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def reconcile_card_in(card_bytes, p2p_bytes, from_date_dt):
+    """Reconcile one card's IN transactions (cached per files and date, independent of OUT options)"""
+    # Loaders are cached on the file bytes, so unchanged uploads are not re-parsed
+    card_df = load_card_journal(card_bytes)
+    p2p_df = load_p2p_statement(p2p_bytes)
+    
+    card_in = get_in_transactions_card(card_df, from_date_dt)
+    p2p_in = get_in_transactions_p2p(p2p_df, from_date_dt)
+    return reconcile_transactions(card_in, p2p_in, 'IN')
+
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def reconcile_card_out(card_bytes, p2p_bytes, from_date_dt, include_withdrawal, include_mandat, include_cashout):
+    """Reconcile one card's OUT transactions (cached per files, date and OUT options)"""
+    card_df = load_card_journal(card_bytes)
+    p2p_df = load_p2p_statement(p2p_bytes)
+    
+    card_out = get_out_transactions_card(card_df, from_date_dt, include_withdrawal, include_mandat)
+    p2p_out = get_out_transactions_p2p(p2p_df, from_date_dt, include_withdrawal, include_cashout)
+    return reconcile_transactions(card_out, p2p_out, 'OUT')
+
+
+def process_card(card_bytes, p2p_bytes, from_date_dt, include_withdrawal, include_mandat, include_cashout):
+    """Reconcile IN and OUT transactions for one card"""
+    return {
+        'in': reconcile_card_in(card_bytes, p2p_bytes, from_date_dt),
+        'out': reconcile_card_out(card_bytes, p2p_bytes, from_date_dt, include_withdrawal, include_mandat, include_cashout)
+    }
+
+
+def card_summary_table(all_results, direction):
+    """Per-card summary table for one direction, built column by column (all_results in card order)"""
+    cards = list(all_results)
+    summaries = [all_results[card][direction]['summary'] for card in cards]
+    missing_p2p = np.array([summary['missing_in_p2p'] for summary in summaries])
+    missing_card = np.array([summary['missing_in_card'] for summary in summaries])
+    missing_amount = np.array([all_results[card][direction]['missing_amount'] for card in cards], dtype=float)
+    
+    return pd.DataFrame({
+        'Status': np.where((missing_p2p == 0) & (missing_card == 0), "✅", "❌"),
+        'Card': cards,
+        'Card Journal': [summary['card_count'] for summary in summaries],
+        'P2P Statement': [summary['p2p_count'] for summary in summaries],
+        'Matched': [summary['matched'] for summary in summaries],
+        'Missing (P2P)': missing_p2p,
+        'Missing (Card)': missing_card,
+        'Missing Amount': np.where(missing_amount > 0, [f"{amount:.2f}" for amount in missing_amount], "-")
+    })
+
+
+def write_only_cell(ws, value=None, style=None, font=None, fill=None, border=None, alignment=None, number_format=None):
+    """Build a styled cell for appending to a write-only worksheet"""
+    cell = WriteOnlyCell(ws, value=value)
+    if style is not None:
+        cell.style = style
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if border is not None:
+        cell.border = border
+    if alignment is not None:
+        cell.alignment = alignment
+    if number_format is not None:
+        cell.number_format = number_format
+    return cell
+
+
 def create_excel_report(all_results, from_date, include_withdrawal, include_mandat, include_cashout):
-    """Create professional Excel report with summary and details"""
-    wb = Workbook()
+    """Create professional Excel report with summary and details (all_results in card order)"""
+    # Write-only mode streams rows to the file instead of keeping every cell in memory,
+    # so each sheet is emitted strictly top to bottom with ws.append()
+    wb = Workbook(write_only=True)
     
     # Styles
     title_font = Font(bold=True, size=16, color="FFFFFF")
@@ -413,29 +538,57 @@ def create_excel_report(all_results, from_date, include_withdrawal, include_mand
     error_font = Font(color="9C0006")
     warning_fill = PatternFill("solid", fgColor="FFEB9C")
     gray_fill = PatternFill("solid", fgColor="F2F2F2")
+    bold_font = Font(bold=True)
+    rules_font = Font(bold=True, size=11)
+    grand_total_font = Font(bold=True, size=12)
+    sheet_section_font = Font(bold=True, size=14)
+    missing_title_font = Font(bold=True, size=11, color="C00000")
+    matched_title_font = Font(bold=True, size=11, color="006100")
     border = Border(
         left=Side(style='thin'), right=Side(style='thin'),
         top=Side(style='thin'), bottom=Side(style='thin')
     )
+    title_alignment = Alignment(horizontal='center', vertical='center')
+    header_alignment = Alignment(horizontal='center')
+    
+    # Table cells use named styles: each is registered once and a cell references it
+    # with a single assignment instead of separate font/fill/border/format writes
+    for named_style in (
+        NamedStyle(name="header_blue", font=header_font, fill=header_fill_blue, border=border, alignment=header_alignment),
+        NamedStyle(name="header_purple", font=header_font, fill=header_fill_purple, border=border, alignment=header_alignment),
+        NamedStyle(name="header_red", font=header_font, fill=header_fill_red, border=border),
+        NamedStyle(name="header_green", font=header_font, fill=header_fill_green, border=border),
+        NamedStyle(name="cell", font=DEFAULT_FONT, border=border),
+        NamedStyle(name="cell_amount", font=DEFAULT_FONT, border=border, number_format='#,##0.00'),
+        NamedStyle(name="cell_error", font=error_font, fill=error_fill, border=border),
+        NamedStyle(name="cell_error_amount", font=error_font, fill=error_fill, border=border, number_format='#,##0.00'),
+        NamedStyle(name="cell_missing", font=DEFAULT_FONT, fill=error_fill, border=border),
+        NamedStyle(name="cell_missing_amount", font=DEFAULT_FONT, fill=error_fill, border=border, number_format='#,##0.00'),
+        NamedStyle(name="status_ok", font=ok_font, fill=ok_fill, border=border),
+        NamedStyle(name="status_warning", font=DEFAULT_FONT, fill=warning_fill, border=border),
+    ):
+        wb.add_named_style(named_style)
     
     # ==================== SUMMARY SHEET ====================
-    ws = wb.active
-    ws.title = "RECONCILIATION REPORT"
+    ws = wb.create_sheet("RECONCILIATION REPORT")
+    
+    # Column widths (must be set before the first row is written)
+    ws.column_dimensions['A'].width = 12
+    ws.column_dimensions['B'].width = 14
+    ws.column_dimensions['C'].width = 14
+    ws.column_dimensions['D'].width = 12
+    ws.column_dimensions['E'].width = 14
+    ws.column_dimensions['F'].width = 14
+    ws.column_dimensions['G'].width = 16
+    ws.column_dimensions['H'].width = 12
     
     # Title
-    ws.merge_cells('A1:H1')
-    ws['A1'] = "CARD RECONCILIATION REPORT"
-    ws['A1'].font = title_font
-    ws['A1'].fill = title_fill
-    ws['A1'].alignment = Alignment(horizontal='center', vertical='center')
+    ws.merged_cells.add('A1:H1')
     ws.row_dimensions[1].height = 30
+    ws.append([write_only_cell(ws, "CARD RECONCILIATION REPORT", font=title_font, fill=title_fill, alignment=title_alignment)])
+    ws.append([])
     
     # Report Info
-    ws['A3'] = "Report Date:"
-    ws['B3'] = datetime.now().strftime('%d/%m/%Y %H:%M')
-    ws['A4'] = "Period From:"
-    ws['B4'] = from_date.strftime('%d/%m/%Y')
-    ws['A5'] = "Options:"
     options_text = []
     if include_withdrawal:
         options_text.append("Withdrawal included")
@@ -449,429 +602,208 @@ def create_excel_report(all_results, from_date, include_withdrawal, include_mand
         options_text.append("Cashout included")
     else:
         options_text.append("Cashout excluded")
-    ws['B5'] = " | ".join(options_text)
     
-    ws['A3'].font = Font(bold=True)
-    ws['A4'].font = Font(bold=True)
-    ws['A5'].font = Font(bold=True)
+    ws.append([write_only_cell(ws, "Report Date:", font=bold_font), datetime.now().strftime('%d/%m/%Y %H:%M')])
+    ws.append([write_only_cell(ws, "Period From:", font=bold_font), from_date.strftime('%d/%m/%Y')])
+    ws.append([write_only_cell(ws, "Options:", font=bold_font), " | ".join(options_text)])
+    ws.append([])
     
     # Rules
-    ws['A7'] = "Matching Rules:"
-    ws['A7'].font = Font(bold=True, size=11)
-    ws['A8'] = "• IN (Deposits): Match by Auth code | 1% fee removed from amounts > 40"
-    ws['A9'] = "• OUT (Withdrawals): Match by Date + Amount + Account | No fee adjustment"
+    ws.append([write_only_cell(ws, "Matching Rules:", font=rules_font)])
+    ws.append(["• IN (Deposits): Match by Auth code | 1% fee removed from amounts > 40"])
+    ws.append(["• OUT (Withdrawals): Match by Date + Amount + Account | No fee adjustment"])
+    ws.append([])
     
     # ==================== SUMMARY TABLE ====================
     row = 11
-    ws.merge_cells(f'A{row}:H{row}')
-    ws[f'A{row}'] = "📊 SUMMARY BY CARD"
-    ws[f'A{row}'].font = Font(bold=True, size=14)
-    ws[f'A{row}'].fill = gray_fill
+    ws.merged_cells.add(f'A{row}:H{row}')
+    ws.append([write_only_cell(ws, "📊 SUMMARY BY CARD", font=sheet_section_font, fill=gray_fill)])
+    ws.append([])
     row += 2
     
-    # IN Summary Header
-    ws[f'A{row}'] = "📥 IN TRANSACTIONS (Deposits)"
-    ws[f'A{row}'].font = Font(bold=True, size=12, color="4472C4")
-    row += 1
-    
-    in_headers = ['Card', 'Card Journal', 'P2P Statement', 'Matched', 'Missing P2P', 'Missing Card', 'Missing Amount', 'Status']
-    for col, header in enumerate(in_headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill_blue
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-    row += 1
-    
-    total_in_missing = 0
-    for card_num, results in sorted(all_results.items()):
-        r = results['in']
-        summary = r['summary']
-        
-        ws.cell(row=row, column=1, value=card_num).border = border
-        ws.cell(row=row, column=2, value=summary['card_count']).border = border
-        ws.cell(row=row, column=3, value=summary['p2p_count']).border = border
-        ws.cell(row=row, column=4, value=summary['matched']).border = border
-        
-        cell_mp = ws.cell(row=row, column=5, value=summary['missing_in_p2p'])
-        cell_mp.border = border
-        if summary['missing_in_p2p'] > 0:
-            cell_mp.fill = error_fill
-            cell_mp.font = error_font
-        
-        cell_mc = ws.cell(row=row, column=6, value=summary['missing_in_card'])
-        cell_mc.border = border
-        if summary['missing_in_card'] > 0:
-            cell_mc.fill = error_fill
-            cell_mc.font = error_font
-        
-        cell_ma = ws.cell(row=row, column=7, value=r['missing_amount'])
-        cell_ma.border = border
-        cell_ma.number_format = '#,##0.00'
-        if r['missing_amount'] > 0:
-            cell_ma.fill = error_fill
-            cell_ma.font = error_font
-        
-        # Status
-        if summary['missing_in_p2p'] == 0 and summary['missing_in_card'] == 0:
-            status_cell = ws.cell(row=row, column=8, value="✓ OK")
-            status_cell.fill = ok_fill
-            status_cell.font = ok_font
-        else:
-            status_cell = ws.cell(row=row, column=8, value="✗ Issues")
-            status_cell.fill = error_fill
-            status_cell.font = error_font
-        status_cell.border = border
-        
-        total_in_missing += r['missing_amount']
+    totals_missing = {}
+    for direction, section_title, section_font, header_style in (
+        ('in', "📥 IN TRANSACTIONS (Deposits)", Font(bold=True, size=12, color="4472C4"), "header_blue"),
+        ('out', "📤 OUT TRANSACTIONS (Withdrawals/Cashouts)", Font(bold=True, size=12, color="7030A0"), "header_purple"),
+    ):
+        # Section Header
+        ws.append([write_only_cell(ws, section_title, font=section_font)])
         row += 1
-    
-    # IN Total row
-    ws.cell(row=row, column=1, value="TOTAL IN").font = Font(bold=True)
-    ws.cell(row=row, column=7, value=total_in_missing).font = Font(bold=True)
-    ws.cell(row=row, column=7).number_format = '#,##0.00'
-    if total_in_missing > 0:
-        ws.cell(row=row, column=7).fill = error_fill
-    row += 2
-    
-    # OUT Summary Header
-    ws[f'A{row}'] = "📤 OUT TRANSACTIONS (Withdrawals/Cashouts)"
-    ws[f'A{row}'].font = Font(bold=True, size=12, color="7030A0")
-    row += 1
-    
-    out_headers = ['Card', 'Card Journal', 'P2P Statement', 'Matched', 'Missing P2P', 'Missing Card', 'Missing Amount', 'Status']
-    for col, header in enumerate(out_headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill_purple
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center')
-    row += 1
-    
-    total_out_missing = 0
-    for card_num, results in sorted(all_results.items()):
-        r = results['out']
-        summary = r['summary']
-        
-        ws.cell(row=row, column=1, value=card_num).border = border
-        ws.cell(row=row, column=2, value=summary['card_count']).border = border
-        ws.cell(row=row, column=3, value=summary['p2p_count']).border = border
-        ws.cell(row=row, column=4, value=summary['matched']).border = border
         
-        cell_mp = ws.cell(row=row, column=5, value=summary['missing_in_p2p'])
-        cell_mp.border = border
-        if summary['missing_in_p2p'] > 0:
-            cell_mp.fill = error_fill
-            cell_mp.font = error_font
-        
-        cell_mc = ws.cell(row=row, column=6, value=summary['missing_in_card'])
-        cell_mc.border = border
-        if summary['missing_in_card'] > 0:
-            cell_mc.fill = error_fill
-            cell_mc.font = error_font
-        
-        cell_ma = ws.cell(row=row, column=7, value=r['missing_amount'])
-        cell_ma.border = border
-        cell_ma.number_format = '#,##0.00'
-        if r['missing_amount'] > 0:
-            cell_ma.fill = error_fill
-            cell_ma.font = error_font
+        headers = ['Card', 'Card Journal', 'P2P Statement', 'Matched', 'Missing P2P', 'Missing Card', 'Missing Amount', 'Status']
+        ws.append([write_only_cell(ws, header, style=header_style) for header in headers])
+        row += 1
         
-        # Status
-        if summary['missing_in_p2p'] == 0 and summary['missing_in_card'] == 0:
-            status_cell = ws.cell(row=row, column=8, value="✓ OK")
-            status_cell.fill = ok_fill
-            status_cell.font = ok_font
-        else:
-            status_cell = ws.cell(row=row, column=8, value="✗ Issues")
-            status_cell.fill = error_fill
-            status_cell.font = error_font
-        status_cell.border = border
+        total_missing = 0
+        for card_num, results in all_results.items():
+            r = results[direction]
+            summary = r['summary']
+            
+            # Status
+            if summary['missing_in_p2p'] == 0 and summary['missing_in_card'] == 0:
+                status_cell = write_only_cell(ws, "✓ OK", style="status_ok")
+            else:
+                status_cell = write_only_cell(ws, "✗ Issues", style="cell_error")
+            
+            ws.append([
+                write_only_cell(ws, card_num, style="cell"),
+                write_only_cell(ws, summary['card_count'], style="cell"),
+                write_only_cell(ws, summary['p2p_count'], style="cell"),
+                write_only_cell(ws, summary['matched'], style="cell"),
+                write_only_cell(ws, summary['missing_in_p2p'], style="cell_error" if summary['missing_in_p2p'] > 0 else "cell"),
+                write_only_cell(ws, summary['missing_in_card'], style="cell_error" if summary['missing_in_card'] > 0 else "cell"),
+                write_only_cell(ws, r['missing_amount'], style="cell_error_amount" if r['missing_amount'] > 0 else "cell_amount"),
+                status_cell
+            ])
+            row += 1
+            
+            total_missing += r['missing_amount']
         
-        total_out_missing += r['missing_amount']
-        row += 1
-    
-    # OUT Total row
-    ws.cell(row=row, column=1, value="TOTAL OUT").font = Font(bold=True)
-    ws.cell(row=row, column=7, value=total_out_missing).font = Font(bold=True)
-    ws.cell(row=row, column=7).number_format = '#,##0.00'
-    if total_out_missing > 0:
-        ws.cell(row=row, column=7).fill = error_fill
-    row += 2
+        # Total row
+        ws.append([
+            write_only_cell(ws, f"TOTAL {direction.upper()}", font=bold_font),
+            None, None, None, None, None,
+            write_only_cell(ws, total_missing, font=bold_font, number_format='#,##0.00',
+                            fill=error_fill if total_missing > 0 else None)
+        ])
+        ws.append([])
+        row += 2
+        totals_missing[direction] = total_missing
     
     # Grand Total
-    ws.merge_cells(f'A{row}:F{row}')
-    ws[f'A{row}'] = "⚠️ TOTAL MISSING AMOUNT (IN + OUT):"
-    ws[f'A{row}'].font = Font(bold=True, size=12)
-    ws.cell(row=row, column=7, value=total_in_missing + total_out_missing)
-    ws.cell(row=row, column=7).font = Font(bold=True, size=12)
-    ws.cell(row=row, column=7).number_format = '#,##0.00'
-    if (total_in_missing + total_out_missing) > 0:
-        ws.cell(row=row, column=7).fill = error_fill
-    
-    # Column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 14
-    ws.column_dimensions['C'].width = 14
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 14
-    ws.column_dimensions['F'].width = 14
-    ws.column_dimensions['G'].width = 16
-    ws.column_dimensions['H'].width = 12
+    grand_total = totals_missing['in'] + totals_missing['out']
+    ws.merged_cells.add(f'A{row}:F{row}')
+    ws.append([
+        write_only_cell(ws, "⚠️ TOTAL MISSING AMOUNT (IN + OUT):", font=grand_total_font),
+        None, None, None, None, None,
+        write_only_cell(ws, grand_total, font=grand_total_font, number_format='#,##0.00',
+                        fill=error_fill if grand_total > 0 else None)
+    ])
     
     # ==================== DETAIL SHEETS PER CARD ====================
-    for card_num, results in sorted(all_results.items()):
+    # Section fonts are shared by every card sheet
+    card_sections = (
+        ('in', "📥 IN TRANSACTIONS (Deposits)", Font(bold=True, size=14, color="4472C4"), 'Auth'),
+        ('out', "📤 OUT TRANSACTIONS (Withdrawals/Cashouts)", Font(bold=True, size=14, color="7030A0"), 'Account'),
+    )
+    for card_num, results in all_results.items():
         ws_card = wb.create_sheet(f"Card {card_num}")
         
+        # Column widths for card sheet
+        for column, width in CARD_SHEET_COLUMN_WIDTHS.items():
+            ws_card.column_dimensions[column].width = width
+        
         # Title
-        ws_card.merge_cells('A1:H1')
-        ws_card[f'A1'] = f"CARD {card_num} - RECONCILIATION DETAILS"
-        ws_card['A1'].font = title_font
-        ws_card['A1'].fill = title_fill
-        ws_card['A1'].alignment = Alignment(horizontal='center', vertical='center')
+        ws_card.merged_cells.add('A1:H1')
         ws_card.row_dimensions[1].height = 30
+        ws_card.append([write_only_cell(ws_card, f"CARD {card_num} - RECONCILIATION DETAILS",
+                                        font=title_font, fill=title_fill, alignment=title_alignment)])
+        ws_card.append([])
         
         row = 3
         
-        # ===== IN SECTION =====
-        ws_card.merge_cells(f'A{row}:H{row}')
-        ws_card[f'A{row}'] = "📥 IN TRANSACTIONS (Deposits)"
-        ws_card[f'A{row}'].font = Font(bold=True, size=14, color="4472C4")
-        ws_card[f'A{row}'].fill = gray_fill
-        row += 2
-        
-        r_in = results['in']
-        
-        # IN Summary
-        ws_card[f'A{row}'] = "Card Journal:"
-        ws_card[f'B{row}'] = r_in['summary']['card_count']
-        ws_card[f'C{row}'] = "P2P Statement:"
-        ws_card[f'D{row}'] = r_in['summary']['p2p_count']
-        ws_card[f'E{row}'] = "Matched:"
-        ws_card[f'F{row}'] = r_in['summary']['matched']
-        ws_card[f'A{row}'].font = Font(bold=True)
-        ws_card[f'C{row}'].font = Font(bold=True)
-        ws_card[f'E{row}'].font = Font(bold=True)
-        row += 2
-        
-        # Missing in P2P
-        if r_in['missing_in_p2p']:
-            ws_card[f'A{row}'] = "❌ MISSING IN P2P STATEMENT"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="C00000")
-            row += 1
+        for direction, section_title, section_font, label_header in card_sections:
+            r = results[direction]
             
-            headers = ['Auth', 'Date', 'Time', 'Amount', 'Description']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_red
-                cell.border = border
-            row += 1
-            
-            for item in r_in['missing_in_p2p']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['Time']).border = border
-                cell_amt = ws_card.cell(row=row, column=4, value=item['Amount'])
-                cell_amt.border = border
-                cell_amt.number_format = '#,##0.00'
-                ws_card.cell(row=row, column=5, value=item['Description']).border = border
-                for c in range(1, 6):
-                    ws_card.cell(row=row, column=c).fill = error_fill
-                row += 1
-            
-            ws_card[f'A{row}'] = "Total Missing:"
-            ws_card[f'A{row}'].font = Font(bold=True)
-            ws_card.cell(row=row, column=4, value=r_in['missing_amount'])
-            ws_card.cell(row=row, column=4).font = Font(bold=True)
-            ws_card.cell(row=row, column=4).number_format = '#,##0.00'
+            # ===== SECTION HEADER =====
+            ws_card.merged_cells.add(f'A{row}:H{row}')
+            ws_card.append([write_only_cell(ws_card, section_title, font=section_font, fill=gray_fill)])
+            ws_card.append([])
             row += 2
-        
-        # Missing in Card
-        if r_in['missing_in_card']:
-            ws_card[f'A{row}'] = "❌ MISSING IN CARD JOURNAL"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="C00000")
-            row += 1
             
-            headers = ['Auth', 'Date', 'Time', 'Amount', 'Type']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_red
-                cell.border = border
-            row += 1
+            # Section Summary
+            ws_card.append([
+                write_only_cell(ws_card, "Card Journal:", font=bold_font), r['summary']['card_count'],
+                write_only_cell(ws_card, "P2P Statement:", font=bold_font), r['summary']['p2p_count'],
+                write_only_cell(ws_card, "Matched:", font=bold_font), r['summary']['matched']
+            ])
+            ws_card.append([])
+            row += 2
             
-            for item in r_in['missing_in_card']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['Time']).border = border
-                cell_amt = ws_card.cell(row=row, column=4, value=item['Amount'])
-                cell_amt.border = border
-                cell_amt.number_format = '#,##0.00'
-                ws_card.cell(row=row, column=5, value=item.get('Type', '-')).border = border
-                for c in range(1, 6):
-                    ws_card.cell(row=row, column=c).fill = error_fill
+            # Missing in P2P
+            if not r['missing_in_p2p'].empty:
+                ws_card.append([write_only_cell(ws_card, "❌ MISSING IN P2P STATEMENT", font=missing_title_font)])
                 row += 1
-            row += 1
-        
-        # Matched IN
-        if r_in['matched_details']:
-            ws_card[f'A{row}'] = "✓ MATCHED TRANSACTIONS"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="006100")
-            row += 1
-            
-            headers = ['Auth', 'Date', 'P2P Amount', 'Adjusted', 'Card Amount', 'Diff', 'Status', 'Fee']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_green
-                cell.border = border
-            row += 1
+                
+                headers = [label_header, 'Date', 'Time', 'Amount', 'Description']
+                ws_card.append([write_only_cell(ws_card, header, style="header_red") for header in headers])
+                row += 1
+                
+                for auth, date, time, amount, description in r['missing_in_p2p'].itertuples(index=False, name=None):
+                    ws_card.append([
+                        write_only_cell(ws_card, auth, style="cell_missing"),
+                        write_only_cell(ws_card, date, style="cell_missing"),
+                        write_only_cell(ws_card, time, style="cell_missing"),
+                        write_only_cell(ws_card, amount, style="cell_missing_amount"),
+                        write_only_cell(ws_card, description, style="cell_missing")
+                    ])
+                    row += 1
+                
+                ws_card.append([
+                    write_only_cell(ws_card, "Total Missing:", font=bold_font),
+                    None, None,
+                    write_only_cell(ws_card, r['missing_amount'], font=bold_font, number_format='#,##0.00')
+                ])
+                ws_card.append([])
+                row += 2
             
-            for item in r_in['matched_details']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['P2P_Amount']).border = border
-                ws_card.cell(row=row, column=4, value=item['Adjusted_Amount']).border = border
-                ws_card.cell(row=row, column=5, value=item['Card_Amount']).border = border
-                ws_card.cell(row=row, column=6, value=item['Difference']).border = border
+            # Missing in Card
+            if not r['missing_in_card'].empty:
+                ws_card.append([write_only_cell(ws_card, "❌ MISSING IN CARD JOURNAL", font=missing_title_font)])
+                row += 1
                 
-                status_cell = ws_card.cell(row=row, column=7, value=item['Status'])
-                status_cell.border = border
-                if item['Status'] == 'OK':
-                    status_cell.fill = ok_fill
-                    status_cell.font = ok_font
-                else:
-                    status_cell.fill = warning_fill
+                headers = [label_header, 'Date', 'Time', 'Amount', 'Type']
+                ws_card.append([write_only_cell(ws_card, header, style="header_red") for header in headers])
+                row += 1
                 
-                ws_card.cell(row=row, column=8, value=item['Fee_Applied']).border = border
+                for auth, date, time, amount, tx_type in r['missing_in_card'].itertuples(index=False, name=None):
+                    ws_card.append([
+                        write_only_cell(ws_card, auth, style="cell_missing"),
+                        write_only_cell(ws_card, date, style="cell_missing"),
+                        write_only_cell(ws_card, time, style="cell_missing"),
+                        write_only_cell(ws_card, amount, style="cell_missing_amount"),
+                        write_only_cell(ws_card, tx_type, style="cell_missing")
+                    ])
+                    row += 1
+                ws_card.append([])
                 row += 1
-            row += 1
-        
-        row += 1
-        
-        # ===== OUT SECTION =====
-        ws_card.merge_cells(f'A{row}:H{row}')
-        ws_card[f'A{row}'] = "📤 OUT TRANSACTIONS (Withdrawals/Cashouts)"
-        ws_card[f'A{row}'].font = Font(bold=True, size=14, color="7030A0")
-        ws_card[f'A{row}'].fill = gray_fill
-        row += 2
-        
-        r_out = results['out']
-        
-        # OUT Summary
-        ws_card[f'A{row}'] = "Card Journal:"
-        ws_card[f'B{row}'] = r_out['summary']['card_count']
-        ws_card[f'C{row}'] = "P2P Statement:"
-        ws_card[f'D{row}'] = r_out['summary']['p2p_count']
-        ws_card[f'E{row}'] = "Matched:"
-        ws_card[f'F{row}'] = r_out['summary']['matched']
-        ws_card[f'A{row}'].font = Font(bold=True)
-        ws_card[f'C{row}'].font = Font(bold=True)
-        ws_card[f'E{row}'].font = Font(bold=True)
-        row += 2
-        
-        # Missing in P2P
-        if r_out['missing_in_p2p']:
-            ws_card[f'A{row}'] = "❌ MISSING IN P2P STATEMENT"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="C00000")
-            row += 1
-            
-            headers = ['Account', 'Date', 'Time', 'Amount', 'Description']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_red
-                cell.border = border
-            row += 1
             
-            for item in r_out['missing_in_p2p']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['Time']).border = border
-                cell_amt = ws_card.cell(row=row, column=4, value=item['Amount'])
-                cell_amt.border = border
-                cell_amt.number_format = '#,##0.00'
-                ws_card.cell(row=row, column=5, value=item['Description']).border = border
-                for c in range(1, 6):
-                    ws_card.cell(row=row, column=c).fill = error_fill
+            # Matched
+            if not r['matched_details'].empty:
+                ws_card.append([write_only_cell(ws_card, "✓ MATCHED TRANSACTIONS", font=matched_title_font)])
                 row += 1
-            
-            ws_card[f'A{row}'] = "Total Missing:"
-            ws_card[f'A{row}'].font = Font(bold=True)
-            ws_card.cell(row=row, column=4, value=r_out['missing_amount'])
-            ws_card.cell(row=row, column=4).font = Font(bold=True)
-            ws_card.cell(row=row, column=4).number_format = '#,##0.00'
-            row += 2
-        
-        # Missing in Card
-        if r_out['missing_in_card']:
-            ws_card[f'A{row}'] = "❌ MISSING IN CARD JOURNAL"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="C00000")
-            row += 1
-            
-            headers = ['Account', 'Date', 'Time', 'Amount', 'Type']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_red
-                cell.border = border
-            row += 1
-            
-            for item in r_out['missing_in_card']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['Time']).border = border
-                cell_amt = ws_card.cell(row=row, column=4, value=item['Amount'])
-                cell_amt.border = border
-                cell_amt.number_format = '#,##0.00'
-                ws_card.cell(row=row, column=5, value=item.get('Type', '-')).border = border
-                for c in range(1, 6):
-                    ws_card.cell(row=row, column=c).fill = error_fill
+                
+                # The fee column only applies to IN transactions
+                headers = [label_header, 'Date', 'P2P Amount', 'Adjusted', 'Card Amount', 'Diff', 'Status']
+                if direction == 'in':
+                    headers.append('Fee')
+                ws_card.append([write_only_cell(ws_card, header, style="header_green") for header in headers])
                 row += 1
-            row += 1
-        
-        # Matched OUT
-        if r_out['matched_details']:
-            ws_card[f'A{row}'] = "✓ MATCHED TRANSACTIONS"
-            ws_card[f'A{row}'].font = Font(bold=True, size=11, color="006100")
-            row += 1
-            
-            headers = ['Account', 'Date', 'P2P Amount', 'Adjusted', 'Card Amount', 'Diff', 'Status']
-            for col, header in enumerate(headers, 1):
-                cell = ws_card.cell(row=row, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill_green
-                cell.border = border
-            row += 1
-            
-            for item in r_out['matched_details']:
-                ws_card.cell(row=row, column=1, value=item['Auth']).border = border
-                ws_card.cell(row=row, column=2, value=item['Date']).border = border
-                ws_card.cell(row=row, column=3, value=item['P2P_Amount']).border = border
-                ws_card.cell(row=row, column=4, value=item['Adjusted_Amount']).border = border
-                ws_card.cell(row=row, column=5, value=item['Card_Amount']).border = border
-                ws_card.cell(row=row, column=6, value=item['Difference']).border = border
                 
-                status_cell = ws_card.cell(row=row, column=7, value=item['Status'])
-                status_cell.border = border
-                if item['Status'] == 'OK':
-                    status_cell.fill = ok_fill
-                    status_cell.font = ok_font
-                else:
-                    status_cell.fill = warning_fill
+                for auth, date, p2p_amount, adjusted, card_amount, difference, status, fee_applied in r['matched_details'].itertuples(index=False, name=None):
+                    status_cell = write_only_cell(ws_card, status, style="status_ok" if status == 'OK' else "status_warning")
+                    
+                    cells = [
+                        write_only_cell(ws_card, auth, style="cell"),
+                        write_only_cell(ws_card, date, style="cell"),
+                        write_only_cell(ws_card, p2p_amount, style="cell"),
+                        write_only_cell(ws_card, adjusted, style="cell"),
+                        write_only_cell(ws_card, card_amount, style="cell"),
+                        write_only_cell(ws_card, difference, style="cell"),
+                        status_cell
+                    ]
+                    if direction == 'in':
+                        cells.append(write_only_cell(ws_card, fee_applied, style="cell"))
+                    ws_card.append(cells)
+                    row += 1
                 
+                if direction == 'in':
+                    ws_card.append([])
+                    row += 1
+            
+            if direction == 'in':
+                ws_card.append([])
                 row += 1
-        
-        # Column widths for card sheet
-        ws_card.column_dimensions['A'].width = 14
-        ws_card.column_dimensions['B'].width = 12
-        ws_card.column_dimensions['C'].width = 14
-        ws_card.column_dimensions['D'].width = 12
-        ws_card.column_dimensions['E'].width = 14
-        ws_card.column_dimensions['F'].width = 10
-        ws_card.column_dimensions['G'].width = 10
-        ws_card.column_dimensions['H'].width = 35
     
     # Save to bytes
     output = BytesIO()
@@ -961,54 +893,46 @@ if card_files and p2p_files:
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Card Journals:**")
-        for card, f in sorted(card_journals.items()):
-            st.write(f"  Card {card}: {f.name}")
+        # One element per list instead of one per file (markdown hard line breaks between entries)
+        st.markdown("  \n".join(f"Card {card}: {f.name}" for card, f in sorted(card_journals.items())))
     
     with col2:
         st.markdown("**P2P Statements:**")
-        for card, f in sorted(p2p_statements.items()):
-            st.write(f"  Card {card}: {f.name}")
+        st.markdown("  \n".join(f"Card {card}: {f.name}" for card, f in sorted(p2p_statements.items())))
     
     # Find matched cards
     matched_cards = set(card_journals.keys()) & set(p2p_statements.keys())
+    ordered_cards = sorted(matched_cards)
     
     if matched_cards:
-        st.success(f"✅ Matched cards: {', '.join(sorted(matched_cards))}")
+        st.success(f"✅ Matched cards: {', '.join(ordered_cards)}")
         
         # Run reconciliation button
         if st.button("🚀 Run Reconciliation", type="primary", use_container_width=True):
             from_date_dt = datetime.combine(from_date, datetime.min.time())
             
+            # Filled in card order, so every later pass iterates it without re-sorting
             all_results = {}
             
             with st.spinner("Running reconciliation..."):
-                for card_num in sorted(matched_cards):
-                    try:
-                        card_file = card_journals[card_num]
-                        p2p_file = p2p_statements[card_num]
-                        
-                        card_file.seek(0)
-                        p2p_file.seek(0)
-                        
-                        card_df = load_card_journal(card_file)
-                        p2p_df = load_p2p_statement(p2p_file)
-                        
-                        # Get IN transactions
-                        card_in = get_in_transactions_card(card_df, from_date_dt)
-                        p2p_in = get_in_transactions_p2p(p2p_df, from_date_dt)
-                        results_in = reconcile_transactions(card_in, p2p_in, 'IN')
-                        
-                        # Get OUT transactions
-                        card_out = get_out_transactions_card(card_df, from_date_dt, include_withdrawal, include_mandat)
-                        p2p_out = get_out_transactions_p2p(p2p_df, from_date_dt, include_withdrawal, include_cashout)
-                        results_out = reconcile_transactions(card_out, p2p_out, 'OUT')
-                        
-                        all_results[card_num] = {
-                            'in': results_in,
-                            'out': results_out
-                        }
-                    except Exception as e:
-                        st.error(f"Error processing card {card_num}: {e}")
+                # Cards are independent: reconcile them on a thread pool (pandas/NumPy release the GIL
+                # in parsing and most kernels). File bytes are read up front so workers never touch
+                # the uploaded file objects, and errors are reported here on the script thread.
+                with ThreadPoolExecutor(max_workers=min(8, len(matched_cards))) as executor:
+                    futures = {
+                        card_num: executor.submit(
+                            process_card,
+                            card_journals[card_num].getvalue(),
+                            p2p_statements[card_num].getvalue(),
+                            from_date_dt, include_withdrawal, include_mandat, include_cashout
+                        )
+                        for card_num in ordered_cards
+                    }
+                    for card_num, future in futures.items():
+                        try:
+                            all_results[card_num] = future.result()
+                        except Exception as e:
+                            st.error(f"Error processing card {card_num}: {e}")
             
             if all_results:
                 # ==================== RECONCILIATION REPORT ====================
@@ -1036,15 +960,22 @@ if card_files and p2p_files:
                 
                 # Calculate totals
                 total_cards = len(all_results)
-                total_in_matched = sum(r['in']['summary']['matched'] for r in all_results.values())
-                total_in_missing_p2p = sum(r['in']['summary']['missing_in_p2p'] for r in all_results.values())
-                total_in_missing_card = sum(r['in']['summary']['missing_in_card'] for r in all_results.values())
-                total_in_missing_amount = sum(r['in']['missing_amount'] for r in all_results.values())
+                total_in_matched = total_in_missing_p2p = total_in_missing_card = total_in_missing_amount = 0
+                total_out_matched = total_out_missing_p2p = total_out_missing_card = total_out_missing_amount = 0
                 
-                total_out_matched = sum(r['out']['summary']['matched'] for r in all_results.values())
-                total_out_missing_p2p = sum(r['out']['summary']['missing_in_p2p'] for r in all_results.values())
-                total_out_missing_card = sum(r['out']['summary']['missing_in_card'] for r in all_results.values())
-                total_out_missing_amount = sum(r['out']['missing_amount'] for r in all_results.values())
+                # Single pass over the cards for all eight totals
+                for r in all_results.values():
+                    in_summary = r['in']['summary']
+                    total_in_matched += in_summary['matched']
+                    total_in_missing_p2p += in_summary['missing_in_p2p']
+                    total_in_missing_card += in_summary['missing_in_card']
+                    total_in_missing_amount += r['in']['missing_amount']
+                    
+                    out_summary = r['out']['summary']
+                    total_out_matched += out_summary['matched']
+                    total_out_missing_p2p += out_summary['missing_in_p2p']
+                    total_out_missing_card += out_summary['missing_in_card']
+                    total_out_missing_amount += r['out']['missing_amount']
                 
                 total_missing = total_in_missing_amount + total_out_missing_amount
                 
@@ -1072,23 +1003,7 @@ if card_files and p2p_files:
                 
                 # ==================== IN TRANSACTIONS SUMMARY ====================
                 st.markdown("### 📥 IN Transactions (Deposits)")
-                in_data = []
-                for card_num, results in sorted(all_results.items()):
-                    r = results['in']
-                    summary = r['summary']
-                    status = "✅" if summary['missing_in_p2p'] == 0 and summary['missing_in_card'] == 0 else "❌"
-                    in_data.append({
-                        'Status': status,
-                        'Card': card_num,
-                        'Card Journal': summary['card_count'],
-                        'P2P Statement': summary['p2p_count'],
-                        'Matched': summary['matched'],
-                        'Missing (P2P)': summary['missing_in_p2p'],
-                        'Missing (Card)': summary['missing_in_card'],
-                        'Missing Amount': f"{r['missing_amount']:.2f}" if r['missing_amount'] > 0 else "-"
-                    })
-                
-                df_in = pd.DataFrame(in_data)
+                df_in = card_summary_table(all_results, 'in')
                 st.dataframe(df_in, use_container_width=True, hide_index=True)
                 
                 if total_in_missing_amount > 0:
@@ -1098,23 +1013,7 @@ if card_files and p2p_files:
                 
                 # ==================== OUT TRANSACTIONS SUMMARY ====================
                 st.markdown("### 📤 OUT Transactions (Withdrawals)")
-                out_data = []
-                for card_num, results in sorted(all_results.items()):
-                    r = results['out']
-                    summary = r['summary']
-                    status = "✅" if summary['missing_in_p2p'] == 0 and summary['missing_in_card'] == 0 else "❌"
-                    out_data.append({
-                        'Status': status,
-                        'Card': card_num,
-                        'Card Journal': summary['card_count'],
-                        'P2P Statement': summary['p2p_count'],
-                        'Matched': summary['matched'],
-                        'Missing (P2P)': summary['missing_in_p2p'],
-                        'Missing (Card)': summary['missing_in_card'],
-                        'Missing Amount': f"{r['missing_amount']:.2f}" if r['missing_amount'] > 0 else "-"
-                    })
-                
-                df_out = pd.DataFrame(out_data)
+                df_out = card_summary_table(all_results, 'out')
                 st.dataframe(df_out, use_container_width=True, hide_index=True)
                 
                 if total_out_missing_amount > 0:
@@ -1123,55 +1022,48 @@ if card_files and p2p_files:
                     st.success("✅ All OUT transactions matched!")
                 
                 # ==================== MISSING TRANSACTIONS DETAIL ====================
-                # Collect all missing transactions
-                all_missing_in_p2p = []
-                all_missing_in_card = []
-                all_missing_out_p2p = []
-                all_missing_out_card = []
-                
-                for card_num, results in sorted(all_results.items()):
-                    for item in results['in']['missing_in_p2p']:
-                        item_copy = item.copy()
-                        item_copy['Card'] = card_num
-                        all_missing_in_p2p.append(item_copy)
-                    for item in results['in']['missing_in_card']:
-                        item_copy = item.copy()
-                        item_copy['Card'] = card_num
-                        all_missing_in_card.append(item_copy)
-                    for item in results['out']['missing_in_p2p']:
-                        item_copy = item.copy()
-                        item_copy['Card'] = card_num
-                        all_missing_out_p2p.append(item_copy)
-                    for item in results['out']['missing_in_card']:
-                        item_copy = item.copy()
-                        item_copy['Card'] = card_num
-                        all_missing_out_card.append(item_copy)
-                
-                if all_missing_in_p2p or all_missing_in_card or all_missing_out_p2p or all_missing_out_card:
+                # Clean reconciliations skip collecting the (empty) per-card missing tables
+                if total_in_missing_p2p + total_in_missing_card + total_out_missing_p2p + total_out_missing_card:
+                    # Collect all missing transactions
+                    all_missing_in_p2p = []
+                    all_missing_in_card = []
+                    all_missing_out_p2p = []
+                    all_missing_out_card = []
+                    
+                    for card_num, results in all_results.items():
+                        for collected, missing in (
+                            (all_missing_in_p2p, results['in']['missing_in_p2p']),
+                            (all_missing_in_card, results['in']['missing_in_card']),
+                            (all_missing_out_p2p, results['out']['missing_in_p2p']),
+                            (all_missing_out_card, results['out']['missing_in_card']),
+                        ):
+                            if not missing.empty:
+                                collected.append(missing.assign(Card=card_num))
+                    
                     st.markdown("---")
                     st.markdown("### ❌ MISSING TRANSACTIONS DETAIL")
                     
                     if all_missing_in_p2p:
                         st.markdown("#### 📥 IN - Missing in P2P Statement")
-                        df = pd.DataFrame(all_missing_in_p2p)
+                        df = pd.concat(all_missing_in_p2p, ignore_index=True)
                         cols = ['Card'] + [c for c in df.columns if c != 'Card']
                         st.dataframe(df[cols], use_container_width=True, hide_index=True)
                     
                     if all_missing_in_card:
                         st.markdown("#### 📥 IN - Missing in Card Journal")
-                        df = pd.DataFrame(all_missing_in_card)
+                        df = pd.concat(all_missing_in_card, ignore_index=True)
                         cols = ['Card'] + [c for c in df.columns if c != 'Card']
                         st.dataframe(df[cols], use_container_width=True, hide_index=True)
                     
                     if all_missing_out_p2p:
                         st.markdown("#### 📤 OUT - Missing in P2P Statement")
-                        df = pd.DataFrame(all_missing_out_p2p)
+                        df = pd.concat(all_missing_out_p2p, ignore_index=True)
                         cols = ['Card'] + [c for c in df.columns if c != 'Card']
                         st.dataframe(df[cols], use_container_width=True, hide_index=True)
                     
                     if all_missing_out_card:
                         st.markdown("#### 📤 OUT - Missing in Card Journal")
-                        df = pd.DataFrame(all_missing_out_card)
+                        df = pd.concat(all_missing_out_card, ignore_index=True)
                         cols = ['Card'] + [c for c in df.columns if c != 'Card']
                         st.dataframe(df[cols], use_container_width=True, hide_index=True)
                 
@@ -1179,7 +1071,7 @@ if card_files and p2p_files:
                 st.markdown("---")
                 st.markdown("### 📋 Detailed View by Card")
                 
-                for card_num, results in sorted(all_results.items()):
+                for card_num, results in all_results.items():
                     in_status = "✅" if results['in']['summary']['missing_in_p2p'] == 0 and results['in']['summary']['missing_in_card'] == 0 else "❌"
                     out_status = "✅" if results['out']['summary']['missing_in_p2p'] == 0 and results['out']['summary']['missing_in_card'] == 0 else "❌"
                     
@@ -1196,17 +1088,17 @@ if card_files and p2p_files:
                             with col3:
                                 st.metric("Missing Card", r['summary']['missing_in_card'])
                             
-                            if r['missing_in_p2p']:
+                            if not r['missing_in_p2p'].empty:
                                 st.markdown("**❌ Missing in P2P Statement:**")
-                                st.dataframe(pd.DataFrame(r['missing_in_p2p']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['missing_in_p2p'], use_container_width=True, hide_index=True)
                             
-                            if r['missing_in_card']:
+                            if not r['missing_in_card'].empty:
                                 st.markdown("**❌ Missing in Card Journal:**")
-                                st.dataframe(pd.DataFrame(r['missing_in_card']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['missing_in_card'], use_container_width=True, hide_index=True)
                             
-                            if r['matched_details']:
+                            if not r['matched_details'].empty:
                                 st.markdown("**✅ Matched Transactions:**")
-                                st.dataframe(pd.DataFrame(r['matched_details']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['matched_details'], use_container_width=True, hide_index=True)
                         
                         with tab_out:
                             r = results['out']
@@ -1218,28 +1110,32 @@ if card_files and p2p_files:
                             with col3:
                                 st.metric("Missing Card", r['summary']['missing_in_card'])
                             
-                            if r['missing_in_p2p']:
+                            if not r['missing_in_p2p'].empty:
                                 st.markdown("**❌ Missing in P2P Statement:**")
-                                st.dataframe(pd.DataFrame(r['missing_in_p2p']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['missing_in_p2p'], use_container_width=True, hide_index=True)
                             
-                            if r['missing_in_card']:
+                            if not r['missing_in_card'].empty:
                                 st.markdown("**❌ Missing in Card Journal:**")
-                                st.dataframe(pd.DataFrame(r['missing_in_card']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['missing_in_card'], use_container_width=True, hide_index=True)
                             
-                            if r['matched_details']:
+                            if not r['matched_details'].empty:
                                 st.markdown("**✅ Matched Transactions:**")
-                                st.dataframe(pd.DataFrame(r['matched_details']), use_container_width=True, hide_index=True)
+                                st.dataframe(r['matched_details'], use_container_width=True, hide_index=True)
                 
                 # ==================== DOWNLOAD REPORT ====================
                 st.markdown("---")
-                excel_file = create_excel_report(all_results, from_date_dt, include_withdrawal, include_mandat, include_cashout)
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 
+                # Deferred download: the workbook is only built when the button is clicked,
+                # instead of on every run and then kept in memory as a file buffer. The click must
+                # not rerun the script: this button is only drawn under "Run Reconciliation", so a
+                # rerun would drop it and its pending callable before the file is fetched
                 st.download_button(
                     label="📥 Download Excel Report",
-                    data=excel_file,
+                    data=lambda: create_excel_report(all_results, from_date_dt, include_withdrawal, include_mandat, include_cashout),
                     file_name=f"recon_report_{timestamp}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    on_click="ignore",
                     use_container_width=True,
                     type="primary"
                 )